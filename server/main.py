@@ -1,29 +1,46 @@
 import asyncio
+import os
 import time
-from collections import defaultdict, deque
+from collections import defaultdict
+from dataclasses import dataclass, field
 
 import uvicorn
-from fastapi import FastAPI, Request, status
+from fastapi import FastAPI, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from server.routers import router
 from server.utils.lifespan import lifespan
-from server.utils.auth_middleware import is_public_path
 from server.utils.common_utils import setup_logging
-from server.utils.access_log_middleware import AccessLogMiddleware
+from server.utils.access_log_middleware import AccessLogMiddleware, extract_client_ip
 
 # 设置日志配置
 setup_logging()
 
 RATE_LIMIT_MAX_ATTEMPTS = 10
 RATE_LIMIT_WINDOW_SECONDS = 60
-RATE_LIMIT_ENDPOINTS = {("/api/auth/token", "POST")}
+RATE_LIMIT_WINDOW_NS = RATE_LIMIT_WINDOW_SECONDS * 1_000_000_000
+# (规范化路径, 大写方法)，启动时确定，请求时只做一次集合查找
+RATE_LIMIT_ENDPOINTS = frozenset({("/api/auth/token", "POST")})
+_RATE_LIMIT_METHODS = frozenset(method for _, method in RATE_LIMIT_ENDPOINTS)
 
-# deque[float] 存每次登录尝试的时间戳，超出 60 秒窗口的旧时间戳就用 popleft() 逐个移除。
-_login_attempts: defaultdict[str, deque[float]] = defaultdict(deque)
-_attempt_lock = asyncio.Lock()#创建一个“异步锁”
+
+@dataclass(slots=True)
+class _AttemptRing:
+    """最近 RATE_LIMIT_MAX_ATTEMPTS 次登录尝试时间戳（monotonic_ns）的环形缓冲区，head 指向最早的一次"""
+
+    # 初始值保证空槽位一定落在窗口之外
+    timestamps: list[int] = field(default_factory=lambda: [-RATE_LIMIT_WINDOW_NS - 1] * RATE_LIMIT_MAX_ATTEMPTS)
+    head: int = 0
+
+
+# 最早一次尝试仍在窗口内，说明窗口内已有 RATE_LIMIT_MAX_ATTEMPTS 次尝试
+_login_attempts: defaultdict[str, _AttemptRing] = defaultdict(_AttemptRing)
+
+# 按 IP 分片的异步锁，不同 IP 的登录请求不再争用同一把锁
+_ATTEMPT_LOCK_STRIPES = 64
+_attempt_locks = [asyncio.Lock() for _ in range(_ATTEMPT_LOCK_STRIPES)]
 
 app = FastAPI(lifespan=lifespan)#lifespan做资源初始化（连数据库、加载配置）和退出清理（关闭连接等）
 app.include_router(router, prefix="/api")
@@ -39,91 +56,80 @@ app.add_middleware(
 
 )
 
-#从请求里取客户端 IP
-def _extract_client_ip(request: Request) -> str:
-    forwarded_for = request.headers.get("x-forwarded-for")
-    if forwarded_for:
-        return forwarded_for.split(",")[0].strip()
-    if request.client:
-        return request.client.host
-    return "unknown"
-
-
-class LoginRateLimitMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        normalized_path = request.url.path.rstrip("/") or "/"
-        request_signature = (normalized_path, request.method.upper())
-
-        if request_signature in RATE_LIMIT_ENDPOINTS:
-            client_ip = _extract_client_ip(request)
-            now = time.monotonic()
-
-            async with _attempt_lock:
-                attempt_history = _login_attempts[client_ip]
-
-                while attempt_history and now - attempt_history[0] > RATE_LIMIT_WINDOW_SECONDS:
-                    attempt_history.popleft()
-
-                if len(attempt_history) >= RATE_LIMIT_MAX_ATTEMPTS:
-                    retry_after = int(max(1, RATE_LIMIT_WINDOW_SECONDS - (now - attempt_history[0])))
-                    return JSONResponse(
-                        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                        content={"detail": "登录尝试过于频繁，请稍后再试"},
-                        headers={"Retry-After": str(retry_after)},
-                    )
-
-                attempt_history.append(now)
-
-            response = await call_next(request)
 
-            if response.status_code < 400:
-                async with _attempt_lock:
-                    _login_attempts.pop(client_ip, None)
+class LoginRateLimitMiddleware:
+    """登录限流中间件，纯 ASGI 实现，非限流请求直接透传"""
 
-            return response
+    def __init__(self, app: ASGIApp):
+        self.app = app
 
-        return await call_next(request)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # 绝大多数请求的方法不在限流范围内，无需再处理路径
+        if (
+            scope["type"] != "http"
+            or scope["method"] not in _RATE_LIMIT_METHODS
+            or (scope["path"].rstrip("/") or "/", scope["method"]) not in RATE_LIMIT_ENDPOINTS
+        ):
+            await self.app(scope, receive, send)
+            return
 
+        client_ip = extract_client_ip(scope)
+        now = time.monotonic_ns()
+        attempt_lock = _attempt_locks[hash(client_ip) & (_ATTEMPT_LOCK_STRIPES - 1)]
 
-# 鉴权中间件
-class AuthMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        # 获取请求路径
-        path = request.url.path
+        retry_after: int | None = None
+        async with attempt_lock:
+            ring = _login_attempts[client_ip]
+            oldest = ring.timestamps[ring.head]
 
-        # 检查是否为公开路径，公开路径无需身份验证
-        if is_public_path(path):
-            return await call_next(request)
+            if now - oldest <= RATE_LIMIT_WINDOW_NS:
+                retry_after = max(1, (RATE_LIMIT_WINDOW_NS - (now - oldest)) // 1_000_000_000)
+            else:
+                ring.timestamps[ring.head] = now
+                ring.head = (ring.head + 1) % RATE_LIMIT_MAX_ATTEMPTS
 
-        if not path.startswith("/api"):
-            # 非API路径，可能是前端路由或静态资源
-            return await call_next(request)
+        # 在锁外发送 429，避免网络 I/O 占用与其他 IP 共享的锁
+        if retry_after is not None:
+            response = JSONResponse(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                content={"detail": "登录尝试过于频繁，请稍后再试"},
+                headers={"Retry-After": str(retry_after)},
+            )
+            await response(scope, receive, send)
+            return
 
-        # # 提取Authorization头
-        # auth_header = request.headers.get("Authorization")
-        # if not auth_header or not auth_header.startswith("Bearer "):
-        #     return JSONResponse(
-        #         status_code=status.HTTP_401_UNAUTHORIZED,
-        #         content={"detail": f"请先登录。Path: {path}"},
-        #         headers={"WWW-Authenticate": "Bearer"}
-        #     )
+        status_code = 500
 
-        # # 获取token
-        # token = auth_header.split("Bearer ")[1]
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
 
-        # # 添加token到请求状态，后续路由可以直接使用
-        # request.state.token = token
+        await self.app(scope, receive, send_with_status)
 
-        # 继续处理请求
-        return await call_next(request)
+        # 登录成功后清空记录；pop 中间没有 await，在事件循环内是原子操作，无需再次加锁
+        if status_code < 400:
+            _login_attempts.pop(client_ip, None)
 
 
 # 添加访问日志中间件（记录请求处理时间）
 app.add_middleware(AccessLogMiddleware)
 
-# 添加鉴权中间件
+# 添加登录限流中间件
 app.add_middleware(LoginRateLimitMiddleware)
-app.add_middleware(AuthMiddleware)
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=5050, threads=10, workers=10, reload=True)
+    # reload 与 workers 互斥，且都要求以导入字符串传入应用；uvicorn[standard] 已包含 uvloop 与 httptools
+    if os.getenv("ENV", "dev") == "dev":
+        uvicorn.run("server.main:app", host="0.0.0.0", port=5050, reload=True, loop="uvloop", http="httptools")
+    else:
+        # 任务队列、登录限流等状态保存在进程内存中，多个 worker 之间不共享，默认单进程
+        uvicorn.run(
+            "server.main:app",
+            host="0.0.0.0",
+            port=5050,
+            workers=int(os.getenv("API_WORKERS") or 1),
+            loop="uvloop",
+            http="httptools",
+        )
@@ -2,10 +2,8 @@
 
 import time
 import logging
-from collections.abc import Callable
 
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 # 创建专用的访问日志记录器
 access_logger = logging.getLogger("access_logger")
@@ -21,47 +19,59 @@ if not access_logger.handlers:
     access_logger.propagate = False
 
 
-def _extract_client_ip(request: Request) -> str:
-    """提取客户端IP地址"""
-    forwarded_for = request.headers.get("x-forwarded-for")
-    if forwarded_for:
-        return forwarded_for.split(",")[0].strip()
-    if request.client:
-        return request.client.host
+def extract_client_ip(scope: Scope) -> str:
+    """从 ASGI scope 中提取客户端IP地址"""
+    for name, value in scope["headers"]:
+        if name == b"x-forwarded-for" and value:
+            return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    if client:
+        return client[0]
     return "unknown"
 
 
-class AccessLogMiddleware(BaseHTTPMiddleware):
-    """访问日志中间件 - 记录请求处理时间"""
+class AccessLogMiddleware:
+    """访问日志中间件 - 记录请求处理时间
 
-    def __init__(self, app, logger: logging.Logger = None):
-        super().__init__(app)
+    纯 ASGI 实现，避免 BaseHTTPMiddleware 为每个请求创建任务组和内存流的开销。
+    """
+
+    def __init__(self, app: ASGIApp, logger: logging.Logger = None):
+        self.app = app
         self.logger = logger or access_logger
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        """处理请求并记录访问日志"""
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
         # 记录请求开始时间
         start_time = time.perf_counter()
 
-        # 获取客户端IP
-        client_ip = _extract_client_ip(request)
+        async def send_with_log(message: Message) -> None:
+            # 与原先 call_next 返回时机一致：响应头发出时记录，流式响应不等待响应体结束
+            if message["type"] == "http.response.start":
+                self._log(scope, message["status"], start_time)
+            await send(message)
 
-        # 处理请求
-        response = await call_next(request)
+        await self.app(scope, receive, send_with_log)
 
+    def _log(self, scope: Scope, status_code: int, start_time: float) -> None:
+        """格式化并记录访问日志"""
         # 计算处理时间
         process_time = time.perf_counter() - start_time
         process_time_ms = int(process_time * 1000)  # 转换为毫秒
 
+        client = scope.get("client")
+        query_string = scope.get("query_string", b"").decode("latin-1")
+
         # 格式化日志消息，添加处理时间
         log_message = (
-            f"{client_ip}:{request.client.port if request.client else 'unknown'} - "
-            f'"{request.method} {request.url.path}{"?" + request.url.query if request.url.query else ""} '
-            f'HTTP/{request.scope["http_version"]}" '
-            f"{response.status_code} - {process_time_ms}ms"
+            f"{extract_client_ip(scope)}:{client[1] if client else 'unknown'} - "
+            f'"{scope["method"]} {scope["path"]}{"?" + query_string if query_string else ""} '
+            f'HTTP/{scope["http_version"]}" '
+            f"{status_code} - {process_time_ms}ms"
         )
 
         # 记录日志
         self.logger.info(log_message)
-
-        return response
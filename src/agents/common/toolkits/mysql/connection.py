@@ -1,186 +1,150 @@
+import asyncio
 import concurrent.futures
+import re
 import threading
 import time
 from contextlib import contextmanager
 from typing import Any
 
 import pymysql
+from dbutils.pooled_db import PooledDB
 from pymysql import MySQLError
-from pymysql.cursors import DictCursor
+from pymysql.constants import CR
+from pymysql.cursors import DictCursor, SSDictCursor
 
 from src.utils import logger
 
+_CONNECTION_LOST_CODES = frozenset({CR.CR_SERVER_GONE_ERROR, CR.CR_SERVER_LOST, CR.CR_SERVER_LOST_EXTENDED})
+
+
+def _is_connection_lost(error: Exception) -> bool:
+    """PyMySQL 把未知列、执行超时等 SQL 错误也映射为 OperationalError，只有连接断开才算致命错误"""
+    if isinstance(error, pymysql.err.InterfaceError):
+        return True
+    return bool(error.args) and error.args[0] in _CONNECTION_LOST_CODES
+
 
 class MySQLConnectionManager:
     """MySQL 数据库连接管理器"""
 
     def __init__(self, config: dict[str, Any]):
         self.config = config
-        self._local = threading.local()
-        self._lock = threading.Lock()
-        self.max_connection_age = 3600  # 1小时后重新连接
-
-    def _get_local_connection(self) -> pymysql.Connection | None:
-        return getattr(self._local, "connection", None)
-
-    def _set_local_connection(self, connection: pymysql.Connection | None) -> None:
-        self._local.connection = connection
-
-    def _get_local_last_time(self) -> float:
-        return float(getattr(self._local, "last_connection_time", 0.0) or 0.0)
-
-    def _set_local_last_time(self, last_time: float) -> None:
-        self._local.last_connection_time = last_time
-
-    def _get_connection(self) -> pymysql.Connection:
-        """获取数据库连接"""
-        current_time = time.time()
-        connection = self._get_local_connection()
-        last_connection_time = self._get_local_last_time()
-
-        if connection is None or not connection.open or current_time - last_connection_time > self.max_connection_age:
-            with self._lock:
-                # double-check inside lock
-                connection = self._get_local_connection()
-                last_connection_time = self._get_local_last_time()
-
-                if (
-                    connection is None
-                    or not connection.open
-                    or current_time - last_connection_time > self.max_connection_age
-                ):
-                    if connection and connection.open:
-                        try:
-                            connection.close()
-                        except Exception:
-                            pass
-
-                    connection = self._create_connection()
-                    self._set_local_connection(connection)
-                    self._set_local_last_time(current_time)
-
-        return connection
-
-    def _create_connection(self) -> pymysql.Connection:
-        """创建新的数据库连接"""
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                connection = pymysql.connect(
-                    host=self.config["host"],
-                    user=self.config["user"],
-                    password=self.config["password"],
-                    database=self.config["database"],
-                    port=self.config["port"],
-                    charset=self.config.get("charset", "utf8mb4"),
-                    cursorclass=DictCursor,
-                    connect_timeout=10,
-                    read_timeout=60,
-                    write_timeout=30,
-                    autocommit=True,
-                )
-                logger.info(f"MySQL connection established successfully (attempt {attempt + 1})")
-                return connection
-
-            except MySQLError as e:
-                logger.warning(f"Connection attempt {attempt + 1} failed: {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(2**attempt)
-                else:
-                    logger.error(f"Failed to connect to MySQL after {max_retries} attempts: {e}")
-                    raise ConnectionError(f"MySQL connection failed: {e}")
+        self.pool_size = int(config.get("pool_size") or 25)
+        self._pool: PooledDB | None = None
+        self._pool_lock = threading.Lock()
+        # 查询线程池与连接池同规模，所有查询共享；超时的查询不会被 join，执行完后线程自动复用
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.pool_size, thread_name_prefix="mysql-query"
+        )
+
+    def _get_pool(self) -> PooledDB:
+        """获取（首次调用时创建）连接池"""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = PooledDB(
+                        creator=pymysql,
+                        mincached=2,
+                        maxcached=10,
+                        maxconnections=self.pool_size,
+                        blocking=True,
+                        reset=False,  # autocommit 连接归还时无需 rollback
+                        # 仅连接断开才重建连接并重试语句，SQL 错误直接抛出，连接继续复用
+                        failures=(pymysql.err.OperationalError, pymysql.err.InterfaceError),
+                        isfatal=_is_connection_lost,
+                        # 借出时 ping 检测连接，仅在服务端已断开（如 wait_timeout）时重连，不按连接时长回收
+                        ping=1,
+                        maxusage=None,
+                        host=self.config["host"],
+                        user=self.config["user"],
+                        password=self.config["password"],
+                        database=self.config["database"],
+                        port=self.config["port"],
+                        charset=self.config.get("charset", "utf8mb4"),
+                        cursorclass=DictCursor,
+                        connect_timeout=10,
+                        read_timeout=60,
+                        write_timeout=30,
+                        autocommit=True,
+                    )
+                    logger.info(f"MySQL connection pool created (max {self.pool_size} connections)")
+        return self._pool
 
     def test_connection(self) -> bool:
         """测试连接是否有效"""
         try:
-            connection = self._get_local_connection()
-            if connection and connection.open:
-                with connection.cursor() as cursor:
-                    cursor.execute("SELECT 1")
-                    cursor.fetchone()
-                return True
+            with self.get_cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            return True
         except Exception:
-            pass
-        return False
-
-    def _invalidate_connection(self, connection: pymysql.Connection | None = None):
-        """关闭并清理失效的连接"""
-        try:
-            if connection:
-                connection.close()
-        except Exception:
-            pass
-        finally:
-            local_connection = self._get_local_connection()
-            if connection is None or local_connection is connection:
-                self._set_local_connection(None)
-                self._set_local_last_time(0.0)
+            return False
 
     @contextmanager
     def get_cursor(self):
-        """获取数据库游标的上下文管理器"""
+        """获取数据库游标的上下文管理器，退出时连接归还连接池"""
         max_retries = 2
-        cursor = None
-        connection = None
-        last_error: Exception | None = None
-
         for attempt in range(max_retries):
             try:
-                connection = self._get_connection()
-                cursor = connection.cursor()
+                connection = self.get_connection()
                 break
-            except Exception as e:
-                last_error = e
-                logger.warning(f"Failed to acquire cursor (attempt {attempt + 1}): {e}")
-                self._invalidate_connection(connection)
-                cursor = None
-                connection = None
+            except MySQLError as e:
+                logger.warning(f"Failed to acquire MySQL connection (attempt {attempt + 1}): {e}")
                 if attempt == max_retries - 1:
-                    raise
+                    raise ConnectionError(f"MySQL connection failed: {e}")
                 time.sleep(1)
 
-        if cursor is None or connection is None:
-            raise last_error or ConnectionError("Unable to acquire MySQL cursor")
-
+        cursor = connection.cursor()
         try:
             yield cursor
             connection.commit()
-        except Exception as e:
+        except Exception:
             try:
                 connection.rollback()
             except Exception:
                 pass
-
-            if "MySQL" in str(e) or "connection" in str(e).lower():
-                logger.warning(f"MySQL connection error encountered, invalidating connection: {e}")
-                self._invalidate_connection(connection)
-
             raise
         finally:
-            if cursor:
-                try:
-                    cursor.close()
-                except Exception:
-                    pass
+            try:
+                cursor.close()
+            except Exception:
+                pass
+            connection.close()
 
     def close(self):
-        """关闭数据库连接"""
-        connection = self._get_local_connection()
-        if connection:
-            try:
-                connection.close()
-            finally:
-                self._set_local_connection(None)
-                self._set_local_last_time(0.0)
-            logger.info("MySQL connection closed")
+        """关闭连接池"""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+            logger.info("MySQL connection pool closed")
 
-    def get_connection(self) -> pymysql.Connection:
-        """对外暴露的连接获取方法"""
-        return self._get_connection()
+    def get_connection(self):
+        """从连接池借出连接，调用 close() 即归还连接池"""
+        return self._get_pool().connection()
 
-    def invalidate_connection(self):
-        """手动标记连接失效"""
-        self._invalidate_connection(self._get_local_connection())
+    def kill_query(self, thread_id: int) -> None:
+        """中止指定连接上正在执行的查询。
+
+        使用不经过连接池的独立连接，避免连接池耗尽时与持有连接的查询互相等待。
+        """
+        try:
+            connection = pymysql.connect(
+                host=self.config["host"],
+                user=self.config["user"],
+                password=self.config["password"],
+                port=self.config["port"],
+                connect_timeout=10,
+            )
+        except MySQLError as e:
+            logger.warning(f"Failed to connect to MySQL to kill query {thread_id}: {e}")
+            return
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("KILL QUERY %s", (thread_id,))
+        except MySQLError as e:
+            logger.warning(f"Failed to kill MySQL query {thread_id}: {e}")
+        finally:
+            connection.close()
 
     @property
     def database_name(self) -> str:
@@ -196,61 +160,107 @@ class QueryResultTooLargeError(Exception):
     """查询结果过大异常"""
 
 
-def execute_query_with_timeout(
+# 已有 LIMIT，或 LIMIT 不能直接追加在末尾（INTO、锁定读子句之后）的语句
+_NO_APPEND_LIMIT_PATTERN = re.compile(
+    r"\b(?:limit|into|for\s+(?:update|share)|lock\s+in\s+share\s+mode)\b", re.IGNORECASE
+)
+
+
+def _with_row_limit(sql: str, max_rows: int) -> str:
+    """为没有 LIMIT 的 SELECT 语句追加 LIMIT，避免整表数据经网络传输。
+
+    含注释、INTO 或锁定读子句的语句无法安全追加，保持原样。
+    """
+    statement = sql.strip().rstrip(";").rstrip()
+    if statement[:6].upper() != "SELECT" or "--" in statement or "#" in statement:
+        return sql
+    if _NO_APPEND_LIMIT_PATTERN.search(statement):
+        return sql
+    return f"{statement} LIMIT {max_rows}"
+
+
+def _run_pooled_query(
     conn_manager: MySQLConnectionManager,
     sql: str,
     params: tuple | None = None,
-    timeout: int = 10,
-):
-    """使用线程池实现超时控制，避免信号导致的生成器问题。
+    max_rows: int | None = None,
+) -> list:
+    """从连接池借出连接执行查询，结束后归还连接池。
 
-    注意：不要在不同线程复用同一个 PyMySQL 连接，否则可能出现
-    "Packet sequence number wrong" / "read from closed file" 等错误。
+    指定 max_rows 时使用流式游标，最多读取 max_rows 行；还有剩余行时在服务端中止查询，
+    否则关闭流式游标会读完并丢弃全部剩余行。
     """
-
-    def query_worker():
-        connection = conn_manager.get_connection()
-        cursor = connection.cursor(DictCursor)
-        try:
+    connection = conn_manager.get_connection()
+    try:
+        if max_rows is None:
+            cursor = connection.cursor()
+        else:
+            sql = _with_row_limit(sql, max_rows)
+            cursor = connection.cursor(SSDictCursor)
+        with cursor:
             if params is None:
                 cursor.execute(sql)
             else:
                 cursor.execute(sql, params)
-            return cursor.fetchall()
-        finally:
-            try:
-                cursor.close()
-            except Exception:
-                pass
-            # 线程池线程生命周期不固定，避免遗留连接
-            conn_manager._invalidate_connection(connection)
+            if max_rows is None:
+                return cursor.fetchall()
+            rows = cursor.fetchmany(max_rows)
+            if len(rows) == max_rows and cursor.fetchone() is not None:
+                conn_manager.kill_query(cursor.connection.thread_id())
+            return rows
+    finally:
+        connection.close()
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-        future = executor.submit(query_worker)
-        try:
-            return future.result(timeout=timeout)
-        except concurrent.futures.TimeoutError:
-            future.cancel()
-            raise QueryTimeoutError(f"Query timeout after {timeout} seconds")
+
+def execute_query_with_timeout(
+    conn_manager: MySQLConnectionManager,
+    sql: str,
+    params: tuple | None = None,
+    timeout: int = 10,
+    max_rows: int | None = None,
+):
+    """在共享线程池中执行查询，实现超时控制，避免信号导致的生成器问题。
+
+    每次查询从连接池借出独立连接，查询结束后归还，不会在线程间共享同一个 PyMySQL 连接。
+    """
+    future = conn_manager._executor.submit(_run_pooled_query, conn_manager, sql, params, max_rows)
+    try:
+        return future.result(timeout=timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        raise QueryTimeoutError(f"Query timeout after {timeout} seconds")
+
+
+async def aexecute_query_with_timeout(
+    conn_manager: MySQLConnectionManager,
+    sql: str,
+    params: tuple | None = None,
+    timeout: int = 10,
+    max_rows: int | None = None,
+):
+    """execute_query_with_timeout 的异步版本，等待查询时不占用事件循环线程"""
+    future = conn_manager._executor.submit(_run_pooled_query, conn_manager, sql, params, max_rows)
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout)
+    except TimeoutError:
+        raise QueryTimeoutError(f"Query timeout after {timeout} seconds")
 
 
 def limit_result_size(result: list, max_chars: int = 10000) -> list:
-    """限制结果大小"""
+    """限制结果大小，按行累计估算的字符数，超出 max_chars 时截断"""
     if not result:
         return result
 
-    result_str = str(result)
-    if len(result_str) > max_chars:
-        limited_result = []
-        current_chars = 0
-        for row in result:
-            row_str = str(row)
-            if current_chars + len(row_str) > max_chars:
-                break
-            limited_result.append(row)
-            current_chars += len(row_str)
-
-        logger.warning(f"Query result truncated from {len(result)} to {len(limited_result)} rows due to size limit")
-        return limited_result
+    # DictCursor 各行列名相同，列名及分隔符的开销只需按首行计算一次
+    first = result[0]
+    row_overhead = sum(len(str(k)) + 4 for k in first) if isinstance(first, dict) else 0
+
+    current_chars = 0
+    for index, row in enumerate(result):
+        values = row.values() if isinstance(row, dict) else row
+        current_chars += row_overhead + sum(len(str(v)) + 2 for v in values)
+        if current_chars > max_chars:
+            logger.warning(f"Query result truncated from {len(result)} to {index} rows due to size limit")
+            return result[:index]
 
     return result
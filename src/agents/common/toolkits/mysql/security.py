@@ -28,6 +28,31 @@ class MySQLSecurityChecker:
         "SHUTDOWN",
     }
 
+    # 危险关键词按子串匹配，合并为一个预编译正则
+    _DANGEROUS_KEYWORD_PATTERN = re.compile("|".join(re.escape(keyword) for keyword in sorted(DANGEROUS_KEYWORDS)))
+
+    # SQL注入模式，合并为一个预编译正则
+    _SQL_INJECTION_PATTERN = re.compile(
+        "|".join(
+            [
+                r"\bor\s+1\s*=\s*1\b",
+                r"\bunion\s+select\b",
+                r"\bexec\s*\(",
+                r"\bxp_cmdshell\b",
+                r"\bsleep\s*\(",
+                r"\bbenchmark\s*\(",
+                r"\bwaitfor\s+delay\b",
+                r"\b;\s*drop\b",
+                r"\b;\s*delete\b",
+                r"\b;\s*update\b",
+                r"\b;\s*insert\b",
+            ]
+        ),
+        re.IGNORECASE,
+    )
+
+    _TABLE_NAME_PATTERN = re.compile(r"^[a-zA-Z_][a-zA-Z0-9_]*$")
+
     @classmethod
     def validate_sql(cls, sql: str) -> bool:
         """验证SQL语句的安全性"""
@@ -38,32 +63,16 @@ class MySQLSecurityChecker:
         sql_upper = sql.strip().upper()
 
         # 检查是否是允许的操作
-        if not any(sql_upper.startswith(op) for op in cls.ALLOWED_OPERATIONS):
+        if not sql_upper.startswith(tuple(cls.ALLOWED_OPERATIONS)):
             return False
 
         # 检查危险关键词
-        for keyword in cls.DANGEROUS_KEYWORDS:
-            if keyword in sql_upper:
-                return False
+        if cls._DANGEROUS_KEYWORD_PATTERN.search(sql_upper):
+            return False
 
         # 检查SQL注入模式
-        sql_injection_patterns = [
-            r"\bor\s+1\s*=\s*1\b",
-            r"\bunion\s+select\b",
-            r"\bexec\s*\(",
-            r"\bxp_cmdshell\b",
-            r"\bsleep\s*\(",
-            r"\bbenchmark\s*\(",
-            r"\bwaitfor\s+delay\b",
-            r"\b;\s*drop\b",
-            r"\b;\s*delete\b",
-            r"\b;\s*update\b",
-            r"\b;\s*insert\b",
-        ]
-
-        for pattern in sql_injection_patterns:
-            if re.search(pattern, sql_upper, re.IGNORECASE):
-                return False
+        if cls._SQL_INJECTION_PATTERN.search(sql_upper):
+            return False
 
         return True
 
@@ -74,7 +83,7 @@ class MySQLSecurityChecker:
             return False
 
         # 检查表名只包含字母、数字、下划线
-        return bool(re.match(r"^[a-zA-Z_][a-zA-Z0-9_]*$", table_name))
+        return bool(cls._TABLE_NAME_PATTERN.match(table_name))
 
     @classmethod
     def validate_timeout(cls, timeout: int) -> bool:
@@ -1,13 +1,18 @@
+import asyncio
+import threading
+import time
 from typing import Annotated, Any
 
-from langchain.tools import tool
+from langchain_core.tools import StructuredTool
 from pydantic import BaseModel, Field
+from pymysql import MySQLError
+from pymysql.constants import ER
 
 from src.utils import logger
 
 from .connection import (
     MySQLConnectionManager,
-    QueryTimeoutError,
+    aexecute_query_with_timeout,
     execute_query_with_timeout,
     limit_result_size,
 )
@@ -17,6 +22,15 @@ from .security import MySQLSecurityChecker
 # 全局连接管理器实例
 _connection_manager: MySQLConnectionManager | None = None
 
+# 单次查询最多读取的行数，超出部分不会从数据库传输
+MAX_QUERY_ROWS = 1000
+
+# 表名列表与表结构的缓存，key 为 (数据库名, 表名)，表名列表使用空表名
+# 过期后自动失效；查询报表或列不存在时立即清空，避免表结构变更后继续返回旧结构
+SCHEMA_CACHE_TTL_SECONDS = 300
+_schema_cache: dict[tuple[str, str], tuple[float, str]] = {}
+_schema_cache_lock = threading.Lock()
+
 
 def get_connection_manager() -> MySQLConnectionManager:
     """获取全局连接管理器"""
@@ -32,6 +46,7 @@ def get_connection_manager() -> MySQLConnectionManager:
             "database": os.getenv("MYSQL_DATABASE"),
             "port": int(os.getenv("MYSQL_PORT") or "3306"),
             "charset": "utf8mb4",
+            "pool_size": int(os.getenv("MYSQL_POOL_SIZE") or "25"),
             "description": os.getenv("MYSQL_DATABASE_DESCRIPTION") or "默认 MySQL 数据库",
         }
         # 验证配置完整性
@@ -46,20 +61,45 @@ def get_connection_manager() -> MySQLConnectionManager:
     return _connection_manager
 
 
+def _get_cached_schema(key: tuple[str, str]) -> str | None:
+    with _schema_cache_lock:
+        cached = _schema_cache.get(key)
+        if cached is None:
+            return None
+        expires_at, value = cached
+        if time.monotonic() >= expires_at:
+            del _schema_cache[key]
+            return None
+        return value
+
+
+def _set_cached_schema(key: tuple[str, str], value: str) -> None:
+    with _schema_cache_lock:
+        _schema_cache[key] = (time.monotonic() + SCHEMA_CACHE_TTL_SECONDS, value)
+
+
+def clear_schema_cache() -> None:
+    """清空表名列表与表结构缓存"""
+    with _schema_cache_lock:
+        _schema_cache.clear()
+
+
 class TableListModel(BaseModel):
     """获取表名列表的参数模型"""
 
     pass
 
 
-@tool(name_or_callable="查询表名及说明", args_schema=TableListModel)
-def mysql_list_tables() -> str:
+def _list_tables() -> str:
     """获取数据库中的所有表名
 
     这个工具用来列出当前数据库中所有的表名，帮助你了解数据库的结构。
     """
     try:
         conn_manager = get_connection_manager()
+        cache_key = (conn_manager.database_name, "")
+        if (cached := _get_cached_schema(cache_key)) is not None:
+            return cached
 
         with conn_manager.get_cursor() as cursor:
             # 获取表名
@@ -93,6 +133,7 @@ def mysql_list_tables() -> str:
             if db_note := conn_manager.config.get("description"):
                 result = f"数据库说明: {db_note}\n\n" + result
             logger.info(f"Retrieved {len(table_names)} tables from database")
+            _set_cached_schema(cache_key, result)
             return result
 
     except Exception as e:
@@ -101,14 +142,25 @@ def mysql_list_tables() -> str:
         return error_msg
 
 
+async def _alist_tables() -> str:
+    return await asyncio.to_thread(_list_tables)
+
+
+mysql_list_tables = StructuredTool.from_function(
+    func=_list_tables,
+    coroutine=_alist_tables,
+    name="查询表名及说明",
+    args_schema=TableListModel,
+)
+
+
 class TableDescribeModel(BaseModel):
     """获取表结构的参数模型"""
 
     table_name: str = Field(description="要查询的表名", example="users")
 
 
-@tool(name_or_callable="描述表", args_schema=TableDescribeModel)
-def mysql_describe_table(table_name: Annotated[str, "要查询结构的表名"]) -> str:
+def _describe_table(table_name: Annotated[str, "要查询结构的表名"]) -> str:
     """获取指定表的详细结构信息
 
     这个工具用来查看表的字段信息、数据类型、是否允许NULL、默认值、键类型等。
@@ -120,47 +172,52 @@ def mysql_describe_table(table_name: Annotated[str, "要查询结构的表名"])
             return "表名包含非法字符，请检查表名"
 
         conn_manager = get_connection_manager()
+        cache_key = (conn_manager.database_name, table_name)
+        if (cached := _get_cached_schema(cache_key)) is not None:
+            return cached
 
         with conn_manager.get_cursor() as cursor:
-            # 获取表结构
-            cursor.execute(f"DESCRIBE `{table_name}`")
-            columns = cursor.fetchall()
+            # 一次查询同时获取字段信息、备注及所属索引
+            cursor.execute(
+                """
+                SELECT c.COLUMN_NAME, c.COLUMN_TYPE, c.IS_NULLABLE, c.COLUMN_KEY, c.COLUMN_DEFAULT,
+                       c.EXTRA, c.COLUMN_COMMENT, s.INDEX_NAME, s.SEQ_IN_INDEX
+                FROM information_schema.COLUMNS c
+                LEFT JOIN information_schema.STATISTICS s
+                    ON s.TABLE_SCHEMA = c.TABLE_SCHEMA
+                    AND s.TABLE_NAME = c.TABLE_NAME
+                    AND s.COLUMN_NAME = c.COLUMN_NAME
+                WHERE c.TABLE_SCHEMA = %s AND c.TABLE_NAME = %s
+                ORDER BY c.ORDINAL_POSITION
+                """,
+                (conn_manager.database_name, table_name),
+            )
+            rows = cursor.fetchall()
 
-            if not columns:
+            if not rows:
                 return f"表 {table_name} 不存在或没有字段"
 
-            # 获取字段备注信息
-            column_comments: dict[str, str] = {}
-            try:
-                cursor.execute(
-                    """
-                    SELECT COLUMN_NAME, COLUMN_COMMENT
-                    FROM information_schema.COLUMNS
-                    WHERE TABLE_NAME = %s AND TABLE_SCHEMA = %s
-                    """,
-                    (table_name, conn_manager.database_name),
-                )
-                comment_rows = cursor.fetchall()
-                for row in comment_rows:
-                    column_name = row.get("COLUMN_NAME")
-                    if column_name:
-                        column_comments[column_name] = row.get("COLUMN_COMMENT") or ""
-            except Exception as e:
-                logger.warning(f"Failed to fetch column comments for table {table_name}: {e}")
+            # 拆分为字段列表与索引信息，一个字段属于多个索引时会出现多行
+            columns: dict[str, dict] = {}
+            index_dict: dict[str, list[tuple[int, str]]] = {}
+            for row in rows:
+                field = row["COLUMN_NAME"] or ""
+                columns.setdefault(field, row)
+                if key_name := row.get("INDEX_NAME"):
+                    index_dict.setdefault(key_name, []).append((row["SEQ_IN_INDEX"], field))
 
             # 格式化输出
             result = f"表 `{table_name}` 的结构:\n\n"
             result += "字段名\t\t类型\t\tNULL\t键\t默认值\t\t额外\t备注\n"
             result += "-" * 80 + "\n"
 
-            for col in columns:
-                field = col["Field"] or ""
-                type_str = col["Type"] or ""
-                null_str = col["Null"] or ""
-                key_str = col["Key"] or ""
-                default_str = col.get("Default") or ""
-                extra_str = col.get("Extra") or ""
-                comment_str = column_comments.get(field, "")
+            for field, col in columns.items():
+                type_str = col["COLUMN_TYPE"] or ""
+                null_str = col["IS_NULLABLE"] or ""
+                key_str = col["COLUMN_KEY"] or ""
+                default_str = col.get("COLUMN_DEFAULT") or ""
+                extra_str = col.get("EXTRA") or ""
+                comment_str = col.get("COLUMN_COMMENT") or ""
 
                 # 格式化输出
                 result += (
@@ -168,26 +225,14 @@ def mysql_describe_table(table_name: Annotated[str, "要查询结构的表名"])
                     f"{default_str:<16}\t{extra_str:<16}\t{comment_str}\n"
                 )
 
-            # 获取索引信息
-            try:
-                cursor.execute(f"SHOW INDEX FROM `{table_name}`")
-                indexes = cursor.fetchall()
-
-                if indexes:
-                    result += "\n索引信息:\n"
-                    index_dict = {}
-                    for idx in indexes:
-                        key_name = idx["Key_name"]
-                        if key_name not in index_dict:
-                            index_dict[key_name] = []
-                        index_dict[key_name].append(idx["Column_name"])
-
-                    for key_name, columns in index_dict.items():
-                        result += f"- {key_name}: {', '.join(columns)}\n"
-            except Exception as e:
-                logger.warning(f"Failed to get index info for table {table_name}: {e}")
+            # 索引信息，与 SHOW INDEX 一致主键排在最前
+            if index_dict:
+                result += "\n索引信息:\n"
+                for key_name, index_columns in sorted(index_dict.items(), key=lambda item: item[0] != "PRIMARY"):
+                    result += f"- {key_name}: {', '.join(field for _, field in sorted(index_columns))}\n"
 
             logger.info(f"Retrieved structure for table {table_name}")
+            _set_cached_schema(cache_key, result)
             return result
 
     except Exception as e:
@@ -196,6 +241,18 @@ def mysql_describe_table(table_name: Annotated[str, "要查询结构的表名"])
         return error_msg
 
 
+async def _adescribe_table(table_name: Annotated[str, "要查询结构的表名"]) -> str:
+    return await asyncio.to_thread(_describe_table, table_name)
+
+
+mysql_describe_table = StructuredTool.from_function(
+    func=_describe_table,
+    coroutine=_adescribe_table,
+    name="描述表",
+    args_schema=TableDescribeModel,
+)
+
+
 class QueryModel(BaseModel):
     """执行SQL查询的参数模型"""
 
@@ -203,8 +260,110 @@ class QueryModel(BaseModel):
     timeout: int | None = Field(default=60, description="查询超时时间（秒），默认60秒，最大600秒", ge=1, le=600)
 
 
-@tool(name_or_callable="执行 SQL 查询", args_schema=QueryModel)
-def mysql_query(
+def _check_query_args(sql: str, timeout: int | None) -> str | None:
+    """校验查询参数，不通过时返回提示信息"""
+    # 验证SQL安全性
+    if not MySQLSecurityChecker.validate_sql(sql):
+        return "SQL语句包含不安全的操作或可能的注入攻击，请检查SQL语句"
+
+    if not MySQLSecurityChecker.validate_timeout(timeout):
+        return "timeout参数必须在1-600之间"
+
+    return None
+
+
+def _query_options(timeout: int | None) -> dict[str, int]:
+    """同步与异步查询共用的执行参数：超时时间与读取行数上限（多读一行用于判断是否超出上限）"""
+    return {"timeout": timeout or 60, "max_rows": MAX_QUERY_ROWS + 1}
+
+
+def _format_query_result(result: list) -> str:
+    """将查询结果格式化为表格文本，result 最多包含 MAX_QUERY_ROWS + 1 行"""
+    if not result:
+        return "查询执行成功，但没有返回任何结果"
+
+    # 多读取的一行仅用于判断结果是否超出 MAX_QUERY_ROWS
+    exceeds_max_rows = len(result) > MAX_QUERY_ROWS
+    total_rows = f"超过 {MAX_QUERY_ROWS} 行" if exceeds_max_rows else f"共 {len(result)} 行"
+    result = result[:MAX_QUERY_ROWS]
+
+    # 限制结果大小
+    limited_result = limit_result_size(result, max_chars=10000)
+
+    # 检查结果是否被截断（超出行数上限或字符数上限）
+    if exceeds_max_rows or len(limited_result) < len(result):
+        warning = f"\n\n⚠️ 警告: 查询结果过大，只显示了前 {len(limited_result)} 行（{total_rows}）。\n"
+        warning += "建议使用更精确的查询条件或使用LIMIT子句来减少返回的数据量。"
+    else:
+        warning = ""
+
+    # 格式化输出
+    if limited_result:
+        # 获取列名
+        columns = list(limited_result[0].keys())
+
+        # 只格式化展示的前50行，每个单元格只转换一次字符串
+        str_rows = [[str(row.get(col, "")) for col in columns] for row in limited_result[:50]]
+
+        # 计算每列的最大宽度，限制最大宽度为50
+        col_widths = [
+            min(50, max(len(str(col)), max((len(r[i]) for r in str_rows), default=0))) for i, col in enumerate(columns)
+        ]
+
+        # 构建表头
+        header = "| " + " | ".join(f"{col:<{width}}" for col, width in zip(columns, col_widths)) + " |"
+        separator = "|" + "|".join("-" * (width + 2) for width in col_widths) + "|"
+
+        # 构建数据行
+        rows = ["| " + " | ".join(f"{cell:<{width}}" for cell, width in zip(r, col_widths)) + " |" for r in str_rows]
+
+        result_str = f"查询结果（共 {len(limited_result)} 行）:\n\n"
+        result_str += header + "\n" + separator + "\n"
+        result_str += "\n".join(rows)  # 最多显示50行
+
+        if len(limited_result) > 50:
+            result_str += f"\n\n... 还有 {len(limited_result) - 50} 行未显示 ..."
+
+        result_str += warning
+
+        logger.info(f"Query executed successfully, returned {len(limited_result)} rows")
+        return result_str
+
+    return "查询执行成功，但返回数据为空"
+
+
+def _format_query_error(sql: str, e: Exception) -> str:
+    """生成查询失败的提示信息"""
+    error_msg = f"SQL查询执行失败: {str(e)}\n\n{sql}"
+
+    # 表或列不存在说明缓存的表结构可能已过期
+    if isinstance(e, MySQLError) and e.args and e.args[0] in (ER.NO_SUCH_TABLE, ER.BAD_FIELD_ERROR):
+        clear_schema_cache()
+
+    # 提供更有用的错误信息
+    message = str(e).lower()
+    if "timeout" in message:
+        error_msg += (
+            "\n\n💡 建议：查询超时了，请尝试以下方法：\n"
+            "1. 减少查询的数据量（使用WHERE条件过滤）\n"
+            "2. 使用LIMIT子句限制返回行数\n"
+            "3. 增加timeout参数值（最大600秒）"
+        )
+    elif "table" in message and "doesn't exist" in message:
+        error_msg += "\n\n💡 建议：表不存在，请使用 mysql_list_tables 查看可用的表名"
+    elif "column" in message and "doesn't exist" in message:
+        error_msg += "\n\n💡 建议：列不存在，请使用 mysql_describe_table 查看表结构"
+    elif "not enough arguments for format string" in message:
+        error_msg += (
+            "\n\n💡 建议：SQL 中的百分号 (%) 被当作参数占位符使用。"
+            " 如需匹配包含百分号的文本，请将百分号写成双百分号 (%%) 或使用参数化查询。"
+        )
+
+    logger.error(error_msg)
+    return error_msg
+
+
+def _query(
     sql: Annotated[str, "要执行的SQL查询语句（只能是SELECT语句）"],
     timeout: Annotated[int | None, "查询超时时间（秒），默认60秒，最大600秒"] = 60,
 ) -> str:
@@ -218,93 +377,33 @@ def mysql_query(
     - timeout: 查询超时时间（防止长时间运行的查询）
     """
     try:
-        # 验证SQL安全性
-        if not MySQLSecurityChecker.validate_sql(sql):
-            return "SQL语句包含不安全的操作或可能的注入攻击，请检查SQL语句"
+        if error := _check_query_args(sql, timeout):
+            return error
+        result = execute_query_with_timeout(get_connection_manager(), sql, **_query_options(timeout))
+        return _format_query_result(result)
+    except Exception as e:
+        return _format_query_error(sql, e)
 
-        if not MySQLSecurityChecker.validate_timeout(timeout):
-            return "timeout参数必须在1-600之间"
-
-        conn_manager = get_connection_manager()
-        effective_timeout = timeout or 60
-        try:
-            result = execute_query_with_timeout(conn_manager, sql, timeout=effective_timeout)
-        except QueryTimeoutError as timeout_error:
-            logger.error(f"MySQL query timed out after {effective_timeout} seconds: {timeout_error}")
-            raise
-        except Exception:
-            conn_manager.invalidate_connection()
-            raise
-
-        if not result:
-            return "查询执行成功，但没有返回任何结果"
-
-        # 限制结果大小
-        limited_result = limit_result_size(result, max_chars=10000)
-
-        # 检查结果是否被截断
-        if len(limited_result) < len(result):
-            warning = f"\n\n⚠️ 警告: 查询结果过大，只显示了前 {len(limited_result)} 行（共 {len(result)} 行）。\n"
-            warning += "建议使用更精确的查询条件或使用LIMIT子句来减少返回的数据量。"
-        else:
-            warning = ""
-
-        # 格式化输出
-        if limited_result:
-            # 获取列名
-            columns = list(limited_result[0].keys())
-
-            # 计算每列的最大宽度
-            col_widths = {}
-            for col in columns:
-                col_widths[col] = max(len(str(col)), max(len(str(row.get(col, ""))) for row in limited_result))
-                col_widths[col] = min(col_widths[col], 50)  # 限制最大宽度
-
-            # 构建表头
-            header = "| " + " | ".join(f"{col:<{col_widths[col]}}" for col in columns) + " |"
-            separator = "|" + "|".join("-" * (col_widths[col] + 2) for col in columns) + "|"
-
-            # 构建数据行
-            rows = []
-            for row in limited_result:
-                row_str = "| " + " | ".join(f"{str(row.get(col, '')):<{col_widths[col]}}" for col in columns) + " |"
-                rows.append(row_str)
-
-            result_str = f"查询结果（共 {len(limited_result)} 行）:\n\n"
-            result_str += header + "\n" + separator + "\n"
-            result_str += "\n".join(rows[:50])  # 最多显示50行
-
-            if len(rows) > 50:
-                result_str += f"\n\n... 还有 {len(rows) - 50} 行未显示 ..."
-
-            result_str += warning
-
-            logger.info(f"Query executed successfully, returned {len(limited_result)} rows")
-            return result_str
-
-        return "查询执行成功，但返回数据为空"
 
+async def _aquery(
+    sql: Annotated[str, "要执行的SQL查询语句（只能是SELECT语句）"],
+    timeout: Annotated[int | None, "查询超时时间（秒），默认60秒，最大600秒"] = 60,
+) -> str:
+    try:
+        if error := _check_query_args(sql, timeout):
+            return error
+        result = await aexecute_query_with_timeout(get_connection_manager(), sql, **_query_options(timeout))
+        return _format_query_result(result)
     except Exception as e:
-        error_msg = f"SQL查询执行失败: {str(e)}\n\n{sql}"
-
-        # 提供更有用的错误信息
-        if "timeout" in str(e).lower():
-            error_msg += "\n\n💡 建议：查询超时了，请尝试以下方法：\n"
-            error_msg += "1. 减少查询的数据量（使用WHERE条件过滤）\n"
-            error_msg += "2. 使用LIMIT子句限制返回行数\n"
-            error_msg += "3. 增加timeout参数值（最大600秒）"
-        elif "table" in str(e).lower() and "doesn't exist" in str(e).lower():
-            error_msg += "\n\n💡 建议：表不存在，请使用 mysql_list_tables 查看可用的表名"
-        elif "column" in str(e).lower() and "doesn't exist" in str(e).lower():
-            error_msg += "\n\n💡 建议：列不存在，请使用 mysql_describe_table 查看表结构"
-        elif "not enough arguments for format string" in str(e).lower():
-            error_msg += (
-                "\n\n💡 建议：SQL 中的百分号 (%) 被当作参数占位符使用。"
-                " 如需匹配包含百分号的文本，请将百分号写成双百分号 (%%) 或使用参数化查询。"
-            )
+        return _format_query_error(sql, e)
 
-        logger.error(error_msg)
-        return error_msg
+
+mysql_query = StructuredTool.from_function(
+    func=_query,
+    coroutine=_aquery,
+    name="执行 SQL 查询",
+    args_schema=QueryModel,
+)
 
 
 def get_mysql_tools() -> list[Any]:
@@ -22,3 +22,8 @@ class Context(BaseContext):
         default=3,
         metadata={"name": "最大步骤数", "description": "最多执行多少个工具（过大可能会很慢）"},
     )
+
+    cache_enabled: bool = field(
+        default=True,
+        metadata={"name": "缓存模型回复", "description": "规划与总结的提示词完全相同时复用 10 分钟内的有效模型回复"},
+    )
@@ -1,7 +1,14 @@
 ﻿from __future__ import annotations
 
+import asyncio
+import hashlib
+import json
+import operator
 import sys
+import time
+from collections import OrderedDict, deque
 from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
 from typing import Annotated, Any, Sequence
 
@@ -28,8 +35,50 @@ def _ensure_toolsagent_sys_path() -> None:
         sys.path.insert(0, toolsagent_path)
 
 
+_RESPONSE_CACHE_MAX_ENTRIES = 256
+_RESPONSE_CACHE_TTL_SECONDS = 600
+# key -> (过期时间, 回复内容)
+_response_cache: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+
+@lru_cache(maxsize=8)
+def _get_chat_model(model_name: str):
+    return load_chat_model(model_name)
+
+
+def _response_cache_key(model_name: str, system_prompt: str, prompt: str) -> str:
+    return hashlib.sha256("\0".join((model_name, system_prompt, prompt)).encode("utf-8")).hexdigest()
+
+
+def _cache_response(model_name: str, system_prompt: str, prompt: str, content: Any) -> None:
+    """缓存模型回复；由调用方确认回复可用后再调用，避免缓存失败或无法解析的回复"""
+    key = _response_cache_key(model_name, system_prompt, prompt)
+    # 已在缓存中说明本次回复来自缓存，保留原过期时间，避免频繁命中的回复永不过期
+    if key in _response_cache:
+        return
+    _response_cache[key] = (time.monotonic() + _RESPONSE_CACHE_TTL_SECONDS, content)
+    if len(_response_cache) > _RESPONSE_CACHE_MAX_ENTRIES:
+        _response_cache.popitem(last=False)
+
+
+async def _ainvoke_content(model_name: str, system_prompt: str, prompt: str, use_cache: bool) -> Any:
+    """调用模型并返回回复内容；启用缓存时，模型与提示词完全相同且缓存未过期则直接复用缓存的回复"""
+    if use_cache:
+        key = _response_cache_key(model_name, system_prompt, prompt)
+        if (cached := _response_cache.get(key)) is not None:
+            expires_at, content = cached
+            if time.monotonic() < expires_at:
+                _response_cache.move_to_end(key)
+                return content
+            del _response_cache[key]
+
+    model = _get_chat_model(model_name)
+    resp = await model.ainvoke([SystemMessage(content=system_prompt), HumanMessage(content=prompt)])
+    return getattr(resp, "content", "") or ""
+
+
 def _last_user_text(messages: Sequence[AnyMessage]) -> str:
-    for msg in reversed(list(messages)):
+    for msg in reversed(messages):
         if isinstance(msg, HumanMessage):
             return msg.content or ""
     return ""
@@ -37,22 +86,27 @@ def _last_user_text(messages: Sequence[AnyMessage]) -> str:
 
 def _format_tool_candidates(tools: list[dict[str, Any]]) -> str:
     lines: list[str] = []
+    append = lines.append
     for tool_info in tools:
-        lines.append(f"- name: {tool_info.get('name')}")
-        if tool_info.get("functionality"):
-            lines.append(f"  functionality: {tool_info.get('functionality')}")
-        if tool_info.get("inputs"):
-            lines.append(f"  inputs: {', '.join(tool_info.get('inputs') or [])}")
-        if tool_info.get("outputs"):
-            lines.append(f"  outputs: {', '.join(tool_info.get('outputs') or [])}")
+        append(f"- name: {tool_info.get('name')}")
+        if functionality := tool_info.get("functionality"):
+            append(f"  functionality: {functionality}")
+        if inputs := tool_info.get("inputs"):
+            append(f"  inputs: {', '.join(inputs)}")
+        if outputs := tool_info.get("outputs"):
+            append(f"  outputs: {', '.join(outputs)}")
     return "\n".join(lines)
 
 
 def _parse_plan_json(text: str) -> list[dict[str, Any]]:
     try:
-        obj = json_repair.loads(text)
-    except Exception:
-        return []
+        obj = json.loads(text)
+    except (TypeError, ValueError):
+        # 模型输出不是合法 JSON 时（如带代码块标记）才走较慢的修复解析
+        try:
+            obj = json_repair.loads(text, skip_json_loads=True)
+        except Exception:
+            return []
     if not isinstance(obj, list):
         return []
     normalized: list[dict[str, Any]] = []
@@ -70,19 +124,53 @@ def _normalize_tool_name(value: Any) -> str:
     return str(value).strip()
 
 
-def _find_tool_info(candidate_tools: list[dict[str, Any]], tool_name: str) -> dict[str, Any] | None:
-    lowered = tool_name.lower()
-    for tool_info in candidate_tools:
-        if str(tool_info.get("name", "")).lower() == lowered:
-            return tool_info
-    return None
+def _index_tools_by_name(candidate_tools: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    # 工具名忽略大小写；逆序构建，重名时保留列表中第一个
+    return {str(tool_info.get("name", "")).lower(): tool_info for tool_info in reversed(candidate_tools)}
+
+
+def _group_independent_steps(
+    plan: list[dict[str, Any]], tool_by_name: dict[str, dict[str, Any]]
+) -> list[list[dict[str, Any]]]:
+    """将计划切分为连续的步骤组，同组步骤互不依赖，可以并发生成工具输入。
+
+    步骤的输入与同组先前步骤的输出有交集、goal 提及同组先前的工具，或输入/输出信息缺失时，视为依赖先前步骤。
+    """
+    groups: list[list[dict[str, Any]]] = []
+    group_outputs: set[str] = set()
+    group_names: list[str] = []
+    outputs_known = False  # 同组已有步骤的输出是否都已知
+    for step in plan:
+        tool_name = _normalize_tool_name(step.get("tool_name")).lower()
+        tool_info = tool_by_name.get(tool_name) or {}
+        inputs = {str(i).lower() for i in tool_info.get("inputs") or []}
+        outputs = {str(o).lower() for o in tool_info.get("outputs") or []}
+        goal = str(step.get("goal", "")).lower()
+
+        if (
+            outputs_known
+            and inputs
+            and inputs.isdisjoint(group_outputs)
+            and not any(name in goal for name in group_names)
+        ):
+            groups[-1].append(step)
+        else:
+            groups.append([step])
+            group_outputs = set()
+            group_names = []
+            outputs_known = True
+
+        group_outputs |= outputs
+        group_names.append(tool_name)
+        outputs_known = outputs_known and bool(outputs)
+    return groups
 
 
 @dataclass
 class SciToolKGState:
     messages: Annotated[Sequence[AnyMessage], add_messages] = field(default_factory=list)
     plan: list[dict[str, Any]] = field(default_factory=list)
-    tool_results: list[dict[str, str]] = field(default_factory=list)
+    tool_results: Annotated[list[dict[str, str]], operator.add] = field(default_factory=list)
     candidate_tools: list[dict[str, Any]] = field(default_factory=list)
 
 
@@ -91,14 +179,34 @@ class SciToolKGAgent(BaseAgent):
     description = "基于 SciToolKG 的规划-执行-总结（Planner/Executor/Summarizer）流程"
     context_schema = Context
 
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._context_cache: tuple[int | None, Context] | None = None
+
+    def _load_context(self) -> Context:
+        """读取智能体配置，配置文件未修改时复用上次解析的结果"""
+        config_file = self.workdir / "config.yaml"
+        mtime = config_file.stat().st_mtime_ns if config_file.exists() else None
+        if self._context_cache is None or self._context_cache[0] != mtime:
+            self._context_cache = (mtime, self.context_schema.from_file(module_name=self.module_name))
+        return self._context_cache[1]
+
     async def get_graph(self, **kwargs):
         if self.graph:
             return self.graph
 
         workflow: StateGraph[SciToolKGState] = StateGraph(SciToolKGState)
 
+        # 图编译时导入一次 SciToolAgent 的执行入口；缺失时仍可编译，执行到 executor 时再报错
+        _ensure_toolsagent_sys_path()
+        try:
+            from tool_runner import run_task_in_process  # type: ignore
+        except ImportError as e:
+            logger.warning(f"SciToolAgent tool_runner is unavailable: {e}")
+            run_task_in_process = None
+
         async def planner(state: SciToolKGState) -> dict[str, Any]:
-            ctx = self.context_schema.from_file(module_name=self.module_name)
+            ctx = self._load_context()
             question = _last_user_text(state.messages).strip()
             if not question:
                 return {"messages": [AIMessage(content="请先给出一个需要解决的科学问题。")]}
@@ -106,8 +214,8 @@ class SciToolKGAgent(BaseAgent):
             rec = recommend_tool_path(question, top_k=ctx.candidate_tools_top_k)
             candidate_tools = rec.get("tools", []) if isinstance(rec, dict) else []
             candidate_tools_text = _format_tool_candidates(candidate_tools)
+            tool_by_name = _index_tools_by_name(candidate_tools)
 
-            model = load_chat_model(ctx.model)
             prompt = (
                 "你是一个科学工具链规划器（Planner）。\n"
                 "基于用户问题，从候选工具中选择一个尽量短的工具序列（按顺序），用于获得解决问题所需的信息。\n"
@@ -118,15 +226,15 @@ class SciToolKGAgent(BaseAgent):
                 "输出要求：只输出 JSON 数组。数组元素为对象，包含字段：tool_name, goal。\n"
                 "示例：[{\"tool_name\":\"ToolA\",\"goal\":\"...\"},{\"tool_name\":\"ToolB\",\"goal\":\"...\"}]\n"
             )
-            resp = await model.ainvoke([SystemMessage(content=ctx.system_prompt), HumanMessage(content=prompt)])
-            plan = _parse_plan_json(getattr(resp, "content", "") or "")
+            content = await _ainvoke_content(ctx.model, ctx.system_prompt, prompt, ctx.cache_enabled)
+            plan = _parse_plan_json(content)
 
             filtered: list[dict[str, Any]] = []
             for item in plan:
                 tool_name = _normalize_tool_name(item.get("tool_name") or item.get("name"))
                 if not tool_name:
                     continue
-                if _find_tool_info(candidate_tools, tool_name) is None:
+                if tool_name.lower() not in tool_by_name:
                     continue
                 filtered.append({"tool_name": tool_name, "goal": str(item.get("goal", "")).strip()})
                 if len(filtered) >= ctx.max_steps:
@@ -138,6 +246,10 @@ class SciToolKGAgent(BaseAgent):
                     "messages": [AIMessage(content="未能从 SciToolKG 候选工具中生成可执行的工具序列。")],
                 }
 
+            # 只缓存能生成可执行计划的回复，模型偶发输出异常时重试仍会重新规划
+            if ctx.cache_enabled:
+                _cache_response(ctx.model, ctx.system_prompt, prompt, content)
+
             plan_text = "\n".join(
                 f"{i + 1}. {p['tool_name']}{(' - ' + p['goal']) if p.get('goal') else ''}"
                 for i, p in enumerate(filtered)
@@ -149,50 +261,58 @@ class SciToolKGAgent(BaseAgent):
             }
 
         async def executor(state: SciToolKGState) -> dict[str, Any]:
-            ctx = self.context_schema.from_file(module_name=self.module_name)
+            ctx = self._load_context()
             question = _last_user_text(state.messages).strip()
-            model = load_chat_model(ctx.model)
-
-            _ensure_toolsagent_sys_path()
-            from tool_runner import run_task_in_process  # type: ignore
-
-            tool_results: list[dict[str, str]] = list(state.tool_results)
-            for step in state.plan:
-                tool_name = _normalize_tool_name(step.get("tool_name"))
-                tool_info = _find_tool_info(state.candidate_tools, tool_name) or {}
-
-                previous_outputs = "\n\n".join(
-                    f"[{r['tool_name']} output]\n{r['output']}" for r in tool_results[-3:]
+            model = _get_chat_model(ctx.model)
+            if run_task_in_process is None:
+                raise ImportError("SciToolAgent tool_runner is unavailable")
+
+            # tool_results 由 operator.add 合并，这里只返回本轮新增的结果；中间结果只取最近 3 条
+            window: deque[dict[str, str]] = deque(state.tool_results[-3:], maxlen=3)
+            new_results: list[dict[str, str]] = []
+            tool_by_name = _index_tools_by_name(state.candidate_tools)
+            for group in _group_independent_steps(state.plan, tool_by_name):
+                previous_outputs = "\n\n".join(f"[{r['tool_name']} output]\n{r['output']}" for r in window)
+                tool_names = [_normalize_tool_name(step.get("tool_name")) for step in group]
+                input_prompts = []
+                for tool_name in tool_names:
+                    tool_info = tool_by_name.get(tool_name.lower()) or {}
+                    input_prompts.append(
+                        "你是一个科学工具执行器（Executor）的输入生成模块。\n"
+                        "为即将调用的工具生成“可直接传入工具函数的输入字符串”，不要输出解释。\n\n"
+                        f"用户问题：\n{question}\n\n"
+                        f"工具名称：{tool_name}\n"
+                        f"工具功能：{tool_info.get('functionality') or ''}\n"
+                        f"工具输入：{', '.join(tool_info.get('inputs') or [])}\n"
+                        f"工具输出：{', '.join(tool_info.get('outputs') or [])}\n\n"
+                        f"已获得的中间结果：\n{previous_outputs}\n\n"
+                        "只输出输入字符串："
+                    )
+                # 同组步骤互不依赖，并发生成各自的工具输入；工具仍按计划顺序依次执行
+                input_resps = await asyncio.gather(
+                    *(
+                        model.ainvoke([SystemMessage(content=ctx.system_prompt), HumanMessage(content=input_prompt)])
+                        for input_prompt in input_prompts
+                    )
                 )
-                input_prompt = (
-                    "你是一个科学工具执行器（Executor）的输入生成模块。\n"
-                    "为即将调用的工具生成“可直接传入工具函数的输入字符串”，不要输出解释。\n\n"
-                    f"用户问题：\n{question}\n\n"
-                    f"工具名称：{tool_name}\n"
-                    f"工具功能：{tool_info.get('functionality') or ''}\n"
-                    f"工具输入：{', '.join(tool_info.get('inputs') or [])}\n"
-                    f"工具输出：{', '.join(tool_info.get('outputs') or [])}\n\n"
-                    f"已获得的中间结果：\n{previous_outputs}\n\n"
-                    "只输出输入字符串："
-                )
-                input_resp = await model.ainvoke(
-                    [SystemMessage(content=ctx.system_prompt), HumanMessage(content=input_prompt)]
-                )
-                tool_input = (getattr(input_resp, "content", "") or "").strip()
 
-                try:
-                    output = await run_task_in_process(tool_name, tool_input)
-                except Exception as e:
-                    output = f"[tool_error] {type(e).__name__}: {e}"
+                for tool_name, input_resp in zip(tool_names, input_resps):
+                    tool_input = (getattr(input_resp, "content", "") or "").strip()
+
+                    try:
+                        output = await run_task_in_process(tool_name, tool_input)
+                    except Exception as e:
+                        output = f"[tool_error] {type(e).__name__}: {e}"
 
-                tool_results.append({"tool_name": tool_name, "input": tool_input, "output": str(output)})
+                    result = {"tool_name": tool_name, "input": tool_input, "output": str(output)}
+                    window.append(result)
+                    new_results.append(result)
 
-            return {"tool_results": tool_results}
+            return {"tool_results": new_results}
 
         async def summarizer(state: SciToolKGState) -> dict[str, Any]:
-            ctx = self.context_schema.from_file(module_name=self.module_name)
+            ctx = self._load_context()
             question = _last_user_text(state.messages).strip()
-            model = load_chat_model(ctx.model)
 
             plan_text = "\n".join(f"{i + 1}. {p.get('tool_name')}" for i, p in enumerate(state.plan))
             results_text = "\n\n".join(
@@ -208,8 +328,9 @@ class SciToolKGAgent(BaseAgent):
                 f"工具结果：\n{results_text}\n\n"
                 "请输出最终回答："
             )
-            resp = await model.ainvoke([SystemMessage(content=ctx.system_prompt), HumanMessage(content=prompt)])
-            answer = getattr(resp, "content", "") or ""
+            answer = await _ainvoke_content(ctx.model, ctx.system_prompt, prompt, ctx.cache_enabled)
+            if ctx.cache_enabled and answer:
+                _cache_response(ctx.model, ctx.system_prompt, prompt, answer)
             return {"messages": [AIMessage(content=answer)]}
 
         workflow.add_node("planner", planner)
@@ -1,13 +1,53 @@
 from __future__ import annotations
 
 from collections import deque
+from functools import cache
 from typing import Any
 
-from src.knowledge.scitoolkg import build_reverse_graph, get_scitoolkg_tools, load_scitoolkg_graph
+from src.knowledge.scitoolkg import build_relation_index, build_reverse_graph, get_scitoolkg_tools, load_scitoolkg_graph
 
 from .base import GraphAdapter
 
 
+@cache
+def _node_meta(node: str) -> dict[str, Any]:
+    """Collect category/functionality/inputs/outputs/type of a node from the relation index.
+
+    The graph is read-only and loaded once, so results are memoized by node name across adapter instances.
+    """
+    rels = build_relation_index().get(node, {})
+    category = next((t for t in rels.get("is a", ()) if t.endswith(" Tool")), None)
+
+    if category:
+        entity_type = category
+    elif "is the input of" in rels:
+        entity_type = "Input"
+    elif "is the output of" in rels:
+        entity_type = "Output"
+    elif any(rel == "is a" for rel, _ in build_reverse_graph().get(node, ())):
+        entity_type = "Category"
+    else:
+        entity_type = "Entity"
+
+    return {
+        "category": category,
+        "functionality": next(iter(rels.get("has the functionality that", ())), None),
+        "inputs": rels.get("inputs", []),
+        "outputs": rels.get("outputs", []),
+        "entity_type": entity_type,
+    }
+
+
+@cache
+def _lowered_names() -> list[tuple[str, str]]:
+    return [(n, n.lower()) for n in load_scitoolkg_graph()]
+
+
+@cache
+def _lowered_functionalities() -> list[tuple[str, str]]:
+    return [(n, (_node_meta(n)["functionality"] or "").lower()) for n in load_scitoolkg_graph()]
+
+
 class SciToolKGGraphAdapter(GraphAdapter):
     """SciToolKG graph adapter backed by SciToolAgent persisted graph_store.json."""
 
@@ -24,17 +64,13 @@ class SciToolKGGraphAdapter(GraphAdapter):
             seed_nodes = [t.name for t in get_scitoolkg_tools()[: max_nodes]]
         else:
             lowered = keyword.lower()
-            exact = [n for n in self._graph.keys() if n.lower() == lowered]
+            exact = [n for n, name in _lowered_names() if name == lowered]
             if exact:
                 seed_nodes = exact
             else:
-                seed_nodes = [n for n in self._graph.keys() if lowered in n.lower()][:5]
+                seed_nodes = [n for n, name in _lowered_names() if lowered in name][:5]
                 if not seed_nodes:
-                    seed_nodes = [
-                        n
-                        for n in self._graph.keys()
-                        if lowered in (self._tool_functionality(n) or "").lower()
-                    ][:5]
+                    seed_nodes = [n for n, functionality in _lowered_functionalities() if lowered in functionality][:5]
 
         nodes_set, edges_set = self._bfs_subgraph(seed_nodes, max_depth=max_depth, max_nodes=max_nodes)
         nodes = [self.normalize_node(n) for n in nodes_set]
@@ -50,31 +86,26 @@ class SciToolKGGraphAdapter(GraphAdapter):
 
     def normalize_node(self, raw_node: Any) -> dict[str, Any]:
         node_name = str(raw_node)
+        meta = _node_meta(node_name)
         properties: dict[str, Any] = {}
         labels: list[str] = []
 
-        category = self._tool_category(node_name)
+        category = meta["category"]
         if category:
             labels.append(category)
             properties["category"] = category
 
-        functionality = self._tool_functionality(node_name)
-        if functionality:
-            properties["functionality"] = functionality
-
-        inputs = self._tool_inputs(node_name)
-        outputs = self._tool_outputs(node_name)
-        if inputs:
-            properties["inputs"] = inputs
-        if outputs:
-            properties["outputs"] = outputs
-
-        entity_type = category or self._infer_node_type(node_name)
+        if meta["functionality"]:
+            properties["functionality"] = meta["functionality"]
+        if meta["inputs"]:
+            properties["inputs"] = list(meta["inputs"])
+        if meta["outputs"]:
+            properties["outputs"] = list(meta["outputs"])
 
         return self._create_standard_node(
             node_id=node_name,
             name=node_name,
-            entity_type=entity_type,
+            entity_type=meta["entity_type"],
             labels=labels,
             properties=properties,
             source="scitoolkg",
@@ -99,58 +130,39 @@ class SciToolKGGraphAdapter(GraphAdapter):
     def _bfs_subgraph(
         self, seed_nodes: list[str], max_depth: int, max_nodes: int
     ) -> tuple[set[str], set[tuple[str, str, str]]]:
+        graph, reverse = self._graph, self._reverse
         visited: set[str] = set()
+        expanded: set[str] = set()
         edges: set[tuple[str, str, str]] = set()
+        add_edge, visit = edges.add, visited.add
 
         q: deque[tuple[str, int]] = deque()
+        enqueue = q.append
         for s in seed_nodes:
-            if s in self._graph:
-                q.append((s, 0))
-                visited.add(s)
+            if s in graph:
+                enqueue((s, 0))
+                visit(s)
 
         while q and len(visited) < max_nodes:
             node, depth = q.popleft()
             if depth >= max_depth:
                 continue
 
-            for rel, target in self._graph.get(node, []):
-                edges.add((node, rel, target))
+            expanded.add(node)
+            next_depth = depth + 1
+            for rel, target in graph.get(node, ()):
+                add_edge((node, rel, target))
                 if target not in visited and len(visited) < max_nodes:
-                    visited.add(target)
-                    q.append((target, depth + 1))
-
-            for rel, source in self._reverse.get(node, []):
-                edges.add((source, rel, node))
+                    visit(target)
+                    enqueue((target, next_depth))
+
+            for rel, source in reverse.get(node, ()):
+                # The edge was already added from the forward adjacency when `source` was expanded
+                if source in expanded:
+                    continue
+                add_edge((source, rel, node))
                 if source not in visited and len(visited) < max_nodes:
-                    visited.add(source)
-                    q.append((source, depth + 1))
+                    visit(source)
+                    enqueue((source, next_depth))
 
         return visited, edges
-
-    def _tool_category(self, node: str) -> str | None:
-        for rel, target in self._graph.get(node, []):
-            if rel == "is a" and target.endswith(" Tool"):
-                return target
-        return None
-
-    def _tool_functionality(self, node: str) -> str | None:
-        for rel, target in self._graph.get(node, []):
-            if rel == "has the functionality that":
-                return target
-        return None
-
-    def _tool_inputs(self, node: str) -> list[str]:
-        return [t for rel, t in self._graph.get(node, []) if rel == "inputs"]
-
-    def _tool_outputs(self, node: str) -> list[str]:
-        return [t for rel, t in self._graph.get(node, []) if rel == "outputs"]
-
-    def _infer_node_type(self, node: str) -> str:
-        if any(rel == "is the input of" for rel, _ in self._graph.get(node, [])):
-            return "Input"
-        if any(rel == "is the output of" for rel, _ in self._graph.get(node, [])):
-            return "Output"
-        if any(rel == "is a" for rel, _ in self._reverse.get(node, [])):
-            return "Category"
-        return "Entity"
-
@@ -1,12 +1,22 @@
+import heapq
 import json
+import os
+import pickle
 import re
+from collections import Counter
 from dataclasses import dataclass
 from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
+from src.utils import logger
 
 _WORD_RE = re.compile(r"[A-Za-z0-9_]+")
+# Equivalent to _WORD_RE on ASCII text: map every character other than letters, digits and underscore to a space
+_NON_WORD_TRANS = {c: " " for c in range(128) if not (chr(c).isalnum() or chr(c) == "_")}
+_STOPWORDS = frozenset(
+    {"the", "a", "an", "to", "of", "and", "or", "in", "on", "for", "with", "is", "are", "what", "how", "please"}
+)
 
 
 @dataclass(frozen=True)
@@ -46,8 +56,22 @@ def load_scitoolkg_graph() -> dict[str, list[tuple[str, str]]]:
         ...
       }
     }
+
+    The parsed graph is cached as `graph_store.pkl` next to the JSON, keyed by the JSON's mtime and size.
     """
     graph_store_path = get_scitoolkg_persist_dir() / "graph_store.json"
+    cache_path = graph_store_path.with_suffix(".pkl")
+    source_stat = graph_store_path.stat()
+    source_key = (source_stat.st_mtime_ns, source_stat.st_size)
+    try:
+        cached_key, cached_graph = pickle.loads(cache_path.read_bytes())
+        if cached_key == source_key:
+            return cached_graph
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable SciToolKG graph cache {cache_path}: {e}")
+
     raw = json.loads(graph_store_path.read_text(encoding="utf-8"))
     graph_dict = raw.get("graph_dict", {})
     graph: dict[str, list[tuple[str, str]]] = {}
@@ -58,6 +82,15 @@ def load_scitoolkg_graph() -> dict[str, list[tuple[str, str]]]:
                 continue
             normalized_edges.append((rel, target))
         graph[str(node)] = normalized_edges
+
+    # Write to a temp file and rename, so workers starting concurrently never read a partial cache
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        tmp_path.write_bytes(pickle.dumps((source_key, graph), protocol=pickle.HIGHEST_PROTOCOL))
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.warning(f"Failed to write SciToolKG graph cache {cache_path}: {e}")
+        tmp_path.unlink(missing_ok=True)
     return graph
 
 
@@ -70,40 +103,64 @@ def build_reverse_graph() -> dict[str, list[tuple[str, str]]]:
     return reverse
 
 
-def _is_tool_node(node: str, graph: dict[str, list[tuple[str, str]]]) -> bool:
-    return any(rel == "is a" and target.endswith(" Tool") for rel, target in graph.get(node, []))
-
-
-def _tool_property(tool: str, rel_name: str) -> list[str]:
-    return [target for rel, target in load_scitoolkg_graph().get(tool, []) if rel == rel_name]
+@lru_cache(maxsize=1)
+def build_relation_index() -> dict[str, dict[str, list[str]]]:
+    """
+    node -> relation -> targets, built in one pass over the graph.
+    """
+    index: dict[str, dict[str, list[str]]] = {}
+    for node, edges in load_scitoolkg_graph().items():
+        rels = index.setdefault(node, {})
+        for rel, target in edges:
+            rels.setdefault(rel, []).append(target)
+    return index
 
 
 @lru_cache(maxsize=1)
 def get_scitoolkg_tools() -> list[SciToolKGTool]:
-    graph = load_scitoolkg_graph()
     tools: list[SciToolKGTool] = []
-    for node in graph.keys():
-        if not _is_tool_node(node, graph):
+    for node, edges in load_scitoolkg_graph().items():
+        is_tool = False
+        category: str | None = None
+        functionality: str | None = None
+        source: str | None = None
+        inputs: list[str] = []
+        outputs: list[str] = []
+        needs_security = does_not_need_security = False
+        for rel, target in edges:
+            if rel == "is a":
+                if category is None:
+                    category = target
+                if target.endswith(" Tool"):
+                    is_tool = True
+            elif rel == "has the functionality that":
+                if functionality is None:
+                    functionality = target
+            elif rel == "is sourced from":
+                if source is None:
+                    source = target
+            elif rel == "inputs":
+                inputs.append(target)
+            elif rel == "outputs":
+                outputs.append(target)
+            elif rel == "needs":
+                if target == "Security Check":
+                    needs_security = True
+            elif rel == "does not need":
+                if target == "Security Check":
+                    does_not_need_security = True
+        if not is_tool:
             continue
 
-        categories = _tool_property(node, "is a")
-        functionality = next(iter(_tool_property(node, "has the functionality that")), None)
-        source = next(iter(_tool_property(node, "is sourced from")), None)
-        needs_security = None
-        if _tool_property(node, "needs") and "Security Check" in _tool_property(node, "needs"):
-            needs_security = True
-        if _tool_property(node, "does not need") and "Security Check" in _tool_property(node, "does not need"):
-            needs_security = False
-
         tools.append(
             SciToolKGTool(
                 name=node,
-                category=categories[0] if categories else None,
+                category=category,
                 functionality=functionality,
-                inputs=_tool_property(node, "inputs"),
-                outputs=_tool_property(node, "outputs"),
+                inputs=inputs,
+                outputs=outputs,
                 source=source,
-                needs_security_check=needs_security,
+                needs_security_check=False if does_not_need_security else (True if needs_security else None),
             )
         )
     return tools
@@ -127,20 +184,19 @@ def get_scitoolkg_stats() -> dict[str, Any]:
 
 
 def _tokenize(text: str) -> set[str]:
-    tokens = {t.lower() for t in _WORD_RE.findall(text)}
-    stop = {"the", "a", "an", "to", "of", "and", "or", "in", "on", "for", "with", "is", "are", "what", "how", "please"}
-    return {t for t in tokens if t not in stop and len(t) >= 2}
+    words = text.translate(_NON_WORD_TRANS).split() if text.isascii() else _WORD_RE.findall(text)
+    tokens = {t.lower() for t in words}
+    return {t for t in tokens if t not in _STOPWORDS and len(t) >= 2}
 
 
-def recommend_tool_path(question: str, top_k: int = 5) -> dict[str, Any]:
+@lru_cache(maxsize=1)
+def _tool_token_index() -> tuple[list[SciToolKGTool], dict[str, list[int]]]:
     """
-    Recommend a tool path based on SciToolKG only (no tool execution).
+    Inverted index: word in a tool's name/category/functionality/inputs/outputs -> tool indices.
     """
-    tokens = _tokenize(question)
     tools = get_scitoolkg_tools()
-
-    scored: list[tuple[int, SciToolKGTool]] = []
-    for tool in tools:
+    index: dict[str, list[int]] = {}
+    for i, tool in enumerate(tools):
         haystack = " ".join(
             [
                 tool.name,
@@ -150,12 +206,32 @@ def recommend_tool_path(question: str, top_k: int = 5) -> dict[str, Any]:
                 " ".join(tool.outputs),
             ]
         ).lower()
-        score = sum(1 for t in tokens if t in haystack)
-        if score > 0:
-            scored.append((score, tool))
+        for word in set(_WORD_RE.findall(haystack)):
+            index.setdefault(word, []).append(i)
+    return tools, index
+
+
+@lru_cache(maxsize=4096)
+def _tools_matching(token: str) -> frozenset[int]:
+    # Tokens contain no separators, so a substring hit always lies inside a single word of the tool text
+    _, index = _tool_token_index()
+    return frozenset(i for word, ids in index.items() if token in word for i in ids)
+
+
+def recommend_tool_path(question: str, top_k: int = 5) -> dict[str, Any]:
+    """
+    Recommend a tool path based on SciToolKG only (no tool execution).
+    """
+    tools, _ = _tool_token_index()
+    counts: Counter[int] = Counter()
+    for token in _tokenize(question):
+        counts.update(_tools_matching(token))
+
+    scored = [(score, tools[i]) for i, score in counts.items()]
 
-    scored.sort(key=lambda x: (x[0], x[1].name), reverse=True)
-    selected = [tool for _, tool in scored[: max(1, top_k)]]
+    # Highest score first, ties broken by tool name in ascending order
+    top = heapq.nsmallest(max(1, top_k), scored, key=lambda x: (-x[0], x[1].name))
+    selected = [tool for _, tool in top]
 
     tool_path = [t.name for t in selected]
     tool_infos = [
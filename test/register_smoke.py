@@ -18,14 +18,16 @@ import httpx
 from dotenv import load_dotenv
 
 
+_SUFFIX_ALPHABET = string.ascii_lowercase + string.digits
+_PHONE_PREFIXES = ("130", "131", "132", "133", "135", "136", "137", "138", "139", "150", "151", "152", "155")
+
+
 def _random_suffix(length: int = 8) -> str:
-    alphabet = string.ascii_lowercase + string.digits
-    return "".join(random.choice(alphabet) for _ in range(length))
+    return "".join(random.choices(_SUFFIX_ALPHABET, k=length))
 
 
 def _random_cn_phone_number() -> str:
-    prefix = random.choice(["130", "131", "132", "133", "135", "136", "137", "138", "139", "150", "151", "152", "155"])
-    return prefix + "".join(random.choice(string.digits) for _ in range(8))
+    return random.choice(_PHONE_PREFIXES) + "".join(random.choices(string.digits, k=8))
 
 
 def _assert_status(response: httpx.Response, expected: int) -> None:
@@ -87,49 +89,58 @@ async def main() -> int:
         assert registered_user["user_id"]
         assert registered_user["id"]
 
-        print("[2] login: by user_id")
-        login_user_id_response = await client.post(
-            "/api/auth/token",
-            data={"username": registered_user["user_id"], "password": password},
-        )
-        _assert_status(login_user_id_response, 200)
-        assert login_user_id_response.json().get("access_token")
-
-        print("[3] login: by phone_number")
-        login_phone_response = await client.post(
-            "/api/auth/token",
-            data={"username": phone_number, "password": password},
-        )
-        _assert_status(login_phone_response, 200)
-        assert login_phone_response.json().get("access_token")
-
-        print("[4] register: duplicate username -> 400")
-        duplicate_username_response = await client.post(
-            "/api/auth/register",
-            json={"username": username, "password": "irrelevant", "phone_number": _random_cn_phone_number()},
-        )
-        _assert_status(duplicate_username_response, 400)
-
-        print("[5] register: duplicate phone -> 400")
-        duplicate_phone_response = await client.post(
-            "/api/auth/register",
-            json={"username": f"smoke_{_random_suffix()}", "password": "irrelevant", "phone_number": phone_number},
-        )
-        _assert_status(duplicate_phone_response, 400)
-
-        print("[6] register: invalid username -> 400")
-        invalid_username_response = await client.post(
-            "/api/auth/register",
-            json={"username": "a", "password": "irrelevant"},
-        )
-        _assert_status(invalid_username_response, 400)
-
-        print("[7] register: invalid phone -> 400")
-        invalid_phone_response = await client.post(
-            "/api/auth/register",
-            json={"username": f"smoke_{_random_suffix()}", "password": "irrelevant", "phone_number": "12345"},
-        )
-        _assert_status(invalid_phone_response, 400)
+        # [2]-[7] 互不依赖，并发发送请求后按顺序校验
+        checks = [
+            (
+                "[2] login: by user_id",
+                200,
+                client.post("/api/auth/token", data={"username": registered_user["user_id"], "password": password}),
+            ),
+            (
+                "[3] login: by phone_number",
+                200,
+                client.post("/api/auth/token", data={"username": phone_number, "password": password}),
+            ),
+            (
+                "[4] register: duplicate username -> 400",
+                400,
+                client.post(
+                    "/api/auth/register",
+                    json={"username": username, "password": "irrelevant", "phone_number": _random_cn_phone_number()},
+                ),
+            ),
+            (
+                "[5] register: duplicate phone -> 400",
+                400,
+                client.post(
+                    "/api/auth/register",
+                    json={
+                        "username": f"smoke_{_random_suffix()}",
+                        "password": "irrelevant",
+                        "phone_number": phone_number,
+                    },
+                ),
+            ),
+            (
+                "[6] register: invalid username -> 400",
+                400,
+                client.post("/api/auth/register", json={"username": "a", "password": "irrelevant"}),
+            ),
+            (
+                "[7] register: invalid phone -> 400",
+                400,
+                client.post(
+                    "/api/auth/register",
+                    json={"username": f"smoke_{_random_suffix()}", "password": "irrelevant", "phone_number": "12345"},
+                ),
+            ),
+        ]
+        responses = await asyncio.gather(*(request for _, _, request in checks))
+        for (label, expected, _), response in zip(checks, responses):
+            print(label)
+            _assert_status(response, expected)
+            if expected == 200:
+                assert response.json().get("access_token")
 
         if not args.no_cleanup and admin_auth:
             print("[8] cleanup: delete created user")
@@ -0,0 +1,95 @@
+"""
+登录限流中间件的单元测试（直接驱动 ASGI 中间件，不需要运行服务）
+"""
+
+from __future__ import annotations
+
+import httpx
+import pytest
+from starlette.types import Receive, Scope, Send
+
+from server.main import RATE_LIMIT_MAX_ATTEMPTS, LoginRateLimitMiddleware, _login_attempts
+
+LOGIN_PATH = "/api/auth/token"
+
+
+class _StatusApp:
+    """按 status_code 返回响应的最小 ASGI 应用，记录被调用次数"""
+
+    def __init__(self, status_code: int = 401):
+        self.status_code = status_code
+        self.calls = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.calls += 1
+        await send({"type": "http.response.start", "status": self.status_code, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+
+@pytest.fixture(autouse=True)
+def _reset_login_attempts():
+    _login_attempts.clear()
+    yield
+    _login_attempts.clear()
+
+
+def _client(app: _StatusApp) -> httpx.AsyncClient:
+    transport = httpx.ASGITransport(app=LoginRateLimitMiddleware(app), client=("10.0.0.1", 123))
+    return httpx.AsyncClient(transport=transport, base_url="http://testserver")
+
+
+async def test_blocks_after_max_failed_attempts():
+    app = _StatusApp(401)
+    async with _client(app) as client:
+        for _ in range(RATE_LIMIT_MAX_ATTEMPTS):
+            assert (await client.post(LOGIN_PATH)).status_code == 401
+
+        resp = await client.post(LOGIN_PATH)
+
+    assert resp.status_code == 429
+    assert 1 <= int(resp.headers["Retry-After"]) <= 60
+    assert app.calls == RATE_LIMIT_MAX_ATTEMPTS
+
+
+async def test_trailing_slash_is_rate_limited():
+    app = _StatusApp(401)
+    async with _client(app) as client:
+        for _ in range(RATE_LIMIT_MAX_ATTEMPTS):
+            await client.post(LOGIN_PATH + "/")
+
+        assert (await client.post(LOGIN_PATH)).status_code == 429
+
+
+async def test_successful_login_resets_attempts():
+    app = _StatusApp(401)
+    async with _client(app) as client:
+        for _ in range(RATE_LIMIT_MAX_ATTEMPTS - 1):
+            await client.post(LOGIN_PATH)
+
+        app.status_code = 200
+        assert (await client.post(LOGIN_PATH)).status_code == 200
+
+        app.status_code = 401
+        for _ in range(RATE_LIMIT_MAX_ATTEMPTS):
+            assert (await client.post(LOGIN_PATH)).status_code == 401
+
+
+async def test_attempts_are_tracked_per_client_ip():
+    app = _StatusApp(401)
+    async with _client(app) as client:
+        for _ in range(RATE_LIMIT_MAX_ATTEMPTS):
+            await client.post(LOGIN_PATH, headers={"X-Forwarded-For": "1.2.3.4"})
+
+        assert (await client.post(LOGIN_PATH, headers={"X-Forwarded-For": "1.2.3.4"})).status_code == 429
+        assert (await client.post(LOGIN_PATH, headers={"X-Forwarded-For": "5.6.7.8"})).status_code == 401
+
+
+@pytest.mark.parametrize(("method", "path"), [("GET", LOGIN_PATH), ("POST", "/api/chat")])
+async def test_other_requests_pass_through(method, path):
+    app = _StatusApp(401)
+    async with _client(app) as client:
+        for _ in range(RATE_LIMIT_MAX_ATTEMPTS + 1):
+            assert (await client.request(method, path)).status_code == 401
+
+    assert app.calls == RATE_LIMIT_MAX_ATTEMPTS + 1
+    assert not _login_attempts
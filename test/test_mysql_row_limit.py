@@ -0,0 +1,129 @@
+"""
+MySQL 查询行数限制的单元测试（不需要数据库）
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from src.agents.common.toolkits.mysql.connection import _run_pooled_query, _with_row_limit
+from src.agents.common.toolkits.mysql.tools import MAX_QUERY_ROWS, _format_query_result
+
+
+@pytest.mark.parametrize(
+    ("sql", "expected"),
+    [
+        ("SELECT * FROM t", "SELECT * FROM t LIMIT 1001"),
+        ("  select id from t where a = 1;  ", "select id from t where a = 1 LIMIT 1001"),
+        ("SELECT a FROM t UNION SELECT b FROM u", "SELECT a FROM t UNION SELECT b FROM u LIMIT 1001"),
+    ],
+)
+def test_with_row_limit_appends_limit(sql, expected):
+    assert _with_row_limit(sql, 1001) == expected
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT * FROM t LIMIT 10",
+        "SELECT * FROM t limit 5, 10",
+        "SELECT * FROM (SELECT * FROM t LIMIT 5) AS x",
+        "SELECT * FROM t FOR SHARE",
+        "SELECT * FROM t FOR UPDATE",
+        "SELECT * FROM t LOCK IN SHARE MODE",
+        "SELECT * FROM t INTO OUTFILE '/tmp/t.csv'",
+        "SELECT id INTO @id FROM t",
+        "SELECT * FROM t -- comment",
+        "SELECT * FROM t # comment",
+        "SHOW TABLES",
+        "EXPLAIN SELECT * FROM t",
+        "WITH x AS (SELECT 1) SELECT * FROM x",
+    ],
+)
+def test_with_row_limit_keeps_statement(sql):
+    assert _with_row_limit(sql, 1001) == sql
+
+
+class _FakeRawConnection:
+    def thread_id(self):
+        return 42
+
+
+class _FakeCursor:
+    def __init__(self, rows):
+        self._rows = list(rows)
+        self.connection = _FakeRawConnection()
+        self.executed = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.executed = sql
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchmany(self, size):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+
+class _FakeConnection:
+    def __init__(self, rows):
+        self.cursor_obj = _FakeCursor(rows)
+        self.closed = False
+
+    def cursor(self, *args):
+        return self.cursor_obj
+
+    def close(self):
+        self.closed = True
+
+
+class _FakeManager:
+    def __init__(self, rows):
+        self.connection = _FakeConnection(rows)
+        self.killed: list[int] = []
+
+    def get_connection(self):
+        return self.connection
+
+    def kill_query(self, thread_id):
+        self.killed.append(thread_id)
+
+
+def test_run_pooled_query_kills_query_when_rows_remain():
+    manager = _FakeManager([{"id": i} for i in range(10)])
+    rows = _run_pooled_query(manager, "SELECT * FROM t LIMIT 100", max_rows=3)
+    assert rows == [{"id": 0}, {"id": 1}, {"id": 2}]
+    assert manager.killed == [42]
+    assert manager.connection.closed
+
+
+@pytest.mark.parametrize("row_count", [0, 2, 3])
+def test_run_pooled_query_does_not_kill_exhausted_result(row_count):
+    manager = _FakeManager([{"id": i} for i in range(row_count)])
+    rows = _run_pooled_query(manager, "SELECT * FROM t", max_rows=3)
+    assert len(rows) == row_count
+    assert manager.killed == []
+    assert manager.connection.cursor_obj.executed == "SELECT * FROM t LIMIT 3"
+
+
+def test_format_query_result_warns_when_row_cap_is_hit():
+    text = _format_query_result([{"a": 1}] * (MAX_QUERY_ROWS + 1))
+    assert f"查询结果（共 {MAX_QUERY_ROWS} 行）" in text
+    assert f"只显示了前 {MAX_QUERY_ROWS} 行（超过 {MAX_QUERY_ROWS} 行）" in text
+
+
+def test_format_query_result_without_truncation_has_no_warning():
+    text = _format_query_result([{"a": 1}] * MAX_QUERY_ROWS)
+    assert f"查询结果（共 {MAX_QUERY_ROWS} 行）" in text
+    assert "警告" not in text
@@ -0,0 +1,149 @@
+"""
+SciToolKG 分词、工具打分与子图 BFS 的单元测试（使用合成图谱，不需要 SciToolAgent 数据）
+"""
+
+from __future__ import annotations
+
+import json
+import random
+from collections import deque
+
+import pytest
+
+import src.knowledge.scitoolkg as scitoolkg
+from src.knowledge.adapters import scitoolkg as scitoolkg_adapter
+from src.knowledge.adapters.scitoolkg import SciToolKGGraphAdapter
+
+_WORDS = (
+    "protein sequence structure dna rna molecule smiles fold predict align blast energy mass spectrum "
+    "gene expression cell image reaction yield toxicity binding docking ligand"
+).split()
+_CATEGORIES = ["Biological Tool", "Chemical Tool", "Material Tool", "General Tool"]
+
+_CACHED_FUNCTIONS = [
+    scitoolkg.load_scitoolkg_graph,
+    scitoolkg.build_reverse_graph,
+    scitoolkg.build_relation_index,
+    scitoolkg.get_scitoolkg_tools,
+    scitoolkg._tool_token_index,
+    scitoolkg._tools_matching,
+    scitoolkg_adapter._node_meta,
+    scitoolkg_adapter._lowered_names,
+    scitoolkg_adapter._lowered_functionalities,
+]
+
+
+def _synthetic_graph_dict(seed: int = 1, tool_count: int = 200) -> dict[str, list[list[str]]]:
+    rng = random.Random(seed)
+    graph: dict[str, list[list[str]]] = {category: [] for category in _CATEGORIES}
+    for i in range(tool_count):
+        name = f"Tool{i}_{rng.choice(_WORDS).title()}"
+        edges = [["is a", rng.choice(_CATEGORIES)], ["has the functionality that", " ".join(rng.sample(_WORDS, 5))]]
+        for rel, reverse_rel in (("inputs", "is the input of"), ("outputs", "is the output of")):
+            for _ in range(rng.randint(0, 3)):
+                entity = " ".join(rng.sample(_WORDS, 2))
+                edges.append([rel, entity])
+                graph.setdefault(entity, []).append([reverse_rel, name])
+        graph[name] = edges
+    return graph
+
+
+@pytest.fixture
+def synthetic_kg(tmp_path, monkeypatch):
+    persist_dir = tmp_path / "SciToolAgent" / "KG" / "storage_graph_large"
+    persist_dir.mkdir(parents=True)
+    (persist_dir / "graph_store.json").write_text(json.dumps({"graph_dict": _synthetic_graph_dict()}), encoding="utf-8")
+    monkeypatch.setattr(scitoolkg, "_repo_root", lambda: tmp_path)
+
+    for func in _CACHED_FUNCTIONS:
+        func.cache_clear()
+    yield
+    for func in _CACHED_FUNCTIONS:
+        func.cache_clear()
+
+
+def _tool_haystack(tool: scitoolkg.SciToolKGTool) -> str:
+    return " ".join(
+        [tool.name, tool.category or "", tool.functionality or "", " ".join(tool.inputs), " ".join(tool.outputs)]
+    ).lower()
+
+
+def _reference_bfs(graph, reverse, seed_nodes, max_depth, max_nodes):
+    """不做任何去重优化的 BFS，作为 _bfs_subgraph 的参照实现"""
+    visited: set[str] = set()
+    edges: set[tuple[str, str, str]] = set()
+
+    q: deque[tuple[str, int]] = deque()
+    for s in seed_nodes:
+        if s in graph:
+            q.append((s, 0))
+            visited.add(s)
+
+    while q and len(visited) < max_nodes:
+        node, depth = q.popleft()
+        if depth >= max_depth:
+            continue
+
+        for rel, target in graph.get(node, []):
+            edges.add((node, rel, target))
+            if target not in visited and len(visited) < max_nodes:
+                visited.add(target)
+                q.append((target, depth + 1))
+
+        for rel, source in reverse.get(node, []):
+            edges.add((source, rel, node))
+            if source not in visited and len(visited) < max_nodes:
+                visited.add(source)
+                q.append((source, depth + 1))
+
+    return visited, edges
+
+
+def test_bfs_subgraph_matches_reference(synthetic_kg):
+    adapter = SciToolKGGraphAdapter()
+    rng = random.Random(3)
+    names = list(adapter._graph)
+    for _ in range(200):
+        seeds = rng.sample(names, rng.randint(1, 4)) + ["missing node"]
+        max_depth, max_nodes = rng.randint(0, 4), rng.randint(1, 400)
+        expected = _reference_bfs(adapter._graph, adapter._reverse, seeds, max_depth, max_nodes)
+        assert adapter._bfs_subgraph(seeds, max_depth=max_depth, max_nodes=max_nodes) == expected
+
+
+def test_tools_matching_equals_substring_search(synthetic_kg):
+    tools, _ = scitoolkg._tool_token_index()
+    haystacks = [_tool_haystack(t) for t in tools]
+    for token in [*_WORDS, "tool1", "tool", "ein", "_f", "ol", "xyz"]:
+        expected = {i for i, haystack in enumerate(haystacks) if token in haystack}
+        assert scitoolkg._tools_matching(token) == expected, token
+
+
+def test_recommend_tool_path_orders_by_score_then_name(synthetic_kg):
+    question = "predict protein structure and docking energy"
+    tokens = scitoolkg._tokenize(question)
+    scores = {}
+    for tool in scitoolkg.get_scitoolkg_tools():
+        haystack = _tool_haystack(tool)
+        if score := sum(1 for t in tokens if t in haystack):
+            scores[tool.name] = score
+    expected = sorted(scores, key=lambda name: (-scores[name], name))[:5]
+
+    assert scitoolkg.recommend_tool_path(question, top_k=5)["tool_path"] == expected
+
+
+def test_tokenize_ascii_matches_regex():
+    rng = random.Random(0)
+    for _ in range(5000):
+        text = "".join(chr(rng.randrange(128)) for _ in range(rng.randint(0, 40)))
+        words = {w.lower() for w in scitoolkg._WORD_RE.findall(text)}
+        expected = {w for w in words if w not in scitoolkg._STOPWORDS and len(w) >= 2}
+        assert scitoolkg._tokenize(text) == expected, repr(text)
+
+
+def test_tokenize_non_ascii_and_stopwords():
+    assert scitoolkg._tokenize("How to predict the Protein-fold of 蛋白质 DNA_seq? a b") == {
+        "predict",
+        "protein",
+        "fold",
+        "dna_seq",
+    }
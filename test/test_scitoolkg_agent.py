@@ -0,0 +1,61 @@
+"""
+SciToolKG 智能体执行计划分组的单元测试（不调用模型）
+"""
+
+from __future__ import annotations
+
+from src.agents.scitoolkg_agent.graph import _group_independent_steps, _index_tools_by_name
+
+TOOLS = _index_tools_by_name(
+    [
+        {"name": "SeqFetch", "inputs": ["protein id"], "outputs": ["protein sequence"]},
+        {"name": "FoldPredict", "inputs": ["Protein Sequence"], "outputs": ["protein structure"]},
+        {"name": "SmilesParse", "inputs": ["smiles"], "outputs": ["molecule"]},
+        {"name": "GeneLookup", "inputs": ["gene name"], "outputs": ["gene record"]},
+        {"name": "NoOutputs", "inputs": ["text"], "outputs": []},
+    ]
+)
+
+
+def _names(groups):
+    return [[step["tool_name"] for step in group] for group in groups]
+
+
+def test_independent_steps_share_a_group():
+    plan = [
+        {"tool_name": "SeqFetch", "goal": "fetch the sequence"},
+        {"tool_name": "smilesparse", "goal": "parse the molecule"},
+        {"tool_name": "GeneLookup", "goal": "look up the gene"},
+    ]
+    assert _names(_group_independent_steps(plan, TOOLS)) == [["SeqFetch", "smilesparse", "GeneLookup"]]
+
+
+def test_step_consuming_previous_output_starts_new_group():
+    plan = [
+        {"tool_name": "SeqFetch", "goal": ""},
+        {"tool_name": "SmilesParse", "goal": ""},
+        {"tool_name": "FoldPredict", "goal": ""},
+    ]
+    assert _names(_group_independent_steps(plan, TOOLS)) == [["SeqFetch", "SmilesParse"], ["FoldPredict"]]
+
+
+def test_goal_mentioning_previous_tool_starts_new_group():
+    plan = [
+        {"tool_name": "SeqFetch", "goal": ""},
+        {"tool_name": "GeneLookup", "goal": "use the SeqFetch result"},
+    ]
+    assert _names(_group_independent_steps(plan, TOOLS)) == [["SeqFetch"], ["GeneLookup"]]
+
+
+def test_steps_with_unknown_io_run_alone():
+    plan = [
+        {"tool_name": "Unknown", "goal": ""},
+        {"tool_name": "SeqFetch", "goal": ""},
+        {"tool_name": "NoOutputs", "goal": ""},
+        {"tool_name": "GeneLookup", "goal": ""},
+    ]
+    assert _names(_group_independent_steps(plan, TOOLS)) == [["Unknown"], ["SeqFetch", "NoOutputs"], ["GeneLookup"]]
+
+
+def test_empty_plan():
+    assert _group_independent_steps([], TOOLS) == []